@@ -1,10 +1,11 @@
 import re
+from bisect import bisect_left
+from functools import lru_cache
 from typing import Optional, List, Tuple, Match, Type, Pattern
 from .util import (
     unikey,
     escape_url,
     expand_tab,
-    expand_leading_tab,
 )
 from .core import Parser, BlockState
 from .helpers import (
@@ -19,18 +20,31 @@ from .helpers import (
 )
 from .list_parser import parse_list, LIST_PATTERN
 
-_INDENT_CODE_TRIM = re.compile(r'^ {1,4}', flags=re.M)
+# a leading tab is expanded to 4 spaces, which are trimmed at the same time
+_INDENT_CODE_TRIM = re.compile(r'^(?: {0,3}\t| {1,4})', flags=re.M)
 _ATX_HEADING_TRIM = re.compile(r'(\s+|^)#+\s*$')
-_BLOCK_QUOTE_TRIM = re.compile(r'^ ?', flags=re.M)
-_BLOCK_QUOTE_LEADING = re.compile(r'^ *>', flags=re.M)
 
+_LAZY_LINE_TAB = re.compile(r'^ {0,3}\t(\t)?', flags=re.M)
 _LINE_BLANK_END = re.compile(r'\n[ \t]*\n$')
 _BLANK_TO_LINE = re.compile(r'[ \t]*\n')
+# a single line of BlockParser.BLANK_LINE, used to locate the start of
+# every blank line for the title limit of link references; it is not
+# affected by a subclass overriding BLANK_LINE
+_BLANK_LINE_START = re.compile(r'^[ \t\v\f]*\n', re.M)
 
+_BLOCK_TAGS_SET = frozenset(BLOCK_TAGS)
+_PRE_TAGS_SET = frozenset(PRE_TAGS)
 _BLOCK_TAGS_PATTERN = '(' + '|'.join(BLOCK_TAGS) + '|' + '|'.join(PRE_TAGS) + ')'
 _OPEN_TAG_END = re.compile(HTML_ATTRIBUTES + r'[ \t]*>[ \t]*(?:\n|$)')
 _CLOSE_TAG_END = re.compile(r'[ \t]*>[ \t]*(?:\n|$)')
 _STRICT_BLOCK_QUOTE = re.compile(r'( {0,3}>[^\n]*(?:\n|$))+')
+_HTML_END_RE = {
+    # the html block ends at the line containing the end marker
+    marker: re.compile(re.escape(marker) + r'[^\n]*(?:\n|$)')
+    for marker in ('-->', '?>', ']]>', '>') + tuple('</' + tag + '>' for tag in PRE_TAGS)
+}
+_END_BT3 = re.compile(r'^ {0,3}`{3,}[ \t]*(?:\n|$)', re.M)
+_END_TILDE3 = re.compile(r'^ {0,3}~{3,}[ \t]*(?:\n|$)', re.M)
 
 
 class BlockParser(Parser[BlockState]):
@@ -89,6 +103,15 @@ class BlockParser(Parser[BlockState]):
         'blank_line',
     )
 
+    # static rules of the scanners used inside parse methods, they are
+    # compiled on use, so that patterns registered by plugins are picked up
+    _SETEX_FALLBACK_RULES = ('thematic_break', 'list')
+    _BLOCK_QUOTE_MARKER_RULES = ('blank_line', 'indent_code', 'fenced_code')
+    _BLOCK_QUOTE_BREAK_RULES = (
+        'blank_line', 'thematic_break', 'fenced_code',
+        'list', 'block_html',
+    )
+
     def __init__(
             self,
             block_quote_rules: Optional[List[str]]=None,
@@ -130,7 +153,6 @@ class BlockParser(Parser[BlockState]):
             return end_pos
 
         code = m.group(0)
-        code = expand_leading_tab(code)
         code = _INDENT_CODE_TRIM.sub('', code)
         code = code.strip('\n')
         state.append_token({'type': 'block_code', 'raw': code, 'style': 'indent'})
@@ -154,14 +176,15 @@ class BlockParser(Parser[BlockState]):
         info = m.group('fenced_3')
 
         c = marker[0]
-        if info and c == '`':
+        if c == '`' and info and '`' in info:
             # CommonMark Example 145
             # Info strings for backtick code blocks cannot contain backticks
-            if info.find(c) != -1:
-                return None
+            return None
 
-        _end = re.compile(
-            r'^ {0,3}' + c + '{' + str(len(marker)) + r',}[ \t]*(?:\n|$)', re.M)
+        if len(marker) == 3:
+            _end = _END_BT3 if c == '`' else _END_TILDE3
+        else:
+            _end = _fenced_end_re(c, len(marker))
         cursor_start = m.end() + 1
 
         m2 = _end.search(state.src, cursor_start)
@@ -173,7 +196,7 @@ class BlockParser(Parser[BlockState]):
             end_pos = state.cursor_max
 
         if spaces and code:
-            _trim_pattern = re.compile('^ {0,' + str(len(spaces)) + '}', re.M)
+            _trim_pattern = _fenced_trim_re(len(spaces))
             code = _trim_pattern.sub('', code)
 
         token = {'type': 'block_code', 'raw': code, 'style': 'fenced', 'marker': marker}
@@ -213,7 +236,7 @@ class BlockParser(Parser[BlockState]):
             last_token['attrs'] = {'level': level}
             return m.end() + 1
 
-        sc = self.compile_sc(['thematic_break', 'list'])
+        sc = self.compile_sc(self._SETEX_FALLBACK_RULES)
         m2 = sc.match(state.src, state.cursor)
         if m2:
             return self.parse_method(m2, state)
@@ -252,9 +275,15 @@ class BlockParser(Parser[BlockState]):
 
         assert href_pos is not None
 
-        _blank = self.BLANK_LINE.search(state.src, href_pos)
-        if _blank:
-            max_pos = _blank.start()
+        # the title must end before the next blank line, blank lines are
+        # located once per source, instead of searching after every href
+        offsets = state.blank_line_offsets
+        if offsets is None:
+            offsets = [b.start() for b in _BLANK_LINE_START.finditer(state.src)]
+            state.blank_line_offsets = offsets
+        i = bisect_left(offsets, href_pos)
+        if i < len(offsets):
+            max_pos = offsets[i]
         else:
             max_pos = state.cursor_max
 
@@ -294,13 +323,16 @@ class BlockParser(Parser[BlockState]):
         """Extract text and cursor end position of a block quote."""
 
         # cleanup at first to detect if it is code block
-        text = m.group('quote_1') + '\n'
-        text = expand_leading_tab(text, 3)
-        text = _BLOCK_QUOTE_TRIM.sub('', text)
+        text = _trim_block_quote_line(m.group('quote_1')) + '\n'
 
-        sc = self.compile_sc(['blank_line', 'indent_code', 'fenced_code'])
+        sc = self.compile_sc(self._BLOCK_QUOTE_MARKER_RULES)
         require_marker = bool(sc.match(text))
 
+        # according to CommonMark Example 6, the second tab should be
+        # treated as 4 spaces; every part is expanded once when it is
+        # collected, instead of a second pass over the joined text
+        parts = [expand_tab(text)]
+
         state.cursor = m.end() + 1
 
         end_pos: Optional[int] = None
@@ -308,25 +340,19 @@ class BlockParser(Parser[BlockState]):
             m2 = _STRICT_BLOCK_QUOTE.match(state.src, state.cursor)
             if m2:
                 quote = m2.group(0)
-                quote = _BLOCK_QUOTE_LEADING.sub('', quote)
-                quote = expand_leading_tab(quote, 3)
-                quote = _BLOCK_QUOTE_TRIM.sub('', quote)
-                text += quote
+                quote = _strip_block_quote_marker(quote)
+                parts.append(expand_tab(quote))
                 state.cursor = m2.end()
         else:
             prev_blank_line = False
-            break_sc = self.compile_sc([
-                'blank_line', 'thematic_break', 'fenced_code',
-                'list', 'block_html',
-            ])
+            strict_match = _STRICT_BLOCK_QUOTE.match
+            break_match = self.compile_sc(self._BLOCK_QUOTE_BREAK_RULES).match
             while state.cursor < state.cursor_max:
-                m3 = _STRICT_BLOCK_QUOTE.match(state.src, state.cursor)
+                m3 = strict_match(state.src, state.cursor)
                 if m3:
                     quote = m3.group(0)
-                    quote = _BLOCK_QUOTE_LEADING.sub('', quote)
-                    quote = expand_leading_tab(quote, 3)
-                    quote = _BLOCK_QUOTE_TRIM.sub('', quote)
-                    text += quote
+                    quote = _strip_block_quote_marker(quote)
+                    parts.append(expand_tab(quote))
                     state.cursor = m3.end()
                     if not quote.strip():
                         prev_blank_line = True
@@ -340,7 +366,7 @@ class BlockParser(Parser[BlockState]):
                     # a block quote and a following paragraph
                     break
 
-                m4 = break_sc.match(state.src, state.cursor)
+                m4 = break_match(state.src, state.cursor)
                 if m4:
                     end_pos = self.parse_method(m4, state)
                     if end_pos:
@@ -349,13 +375,10 @@ class BlockParser(Parser[BlockState]):
                 # lazy continuation line
                 pos = state.find_line_end()
                 line = state.get_text(pos)
-                line = expand_leading_tab(line, 3)
-                text += line
+                parts.append(_expand_lazy_line(line))
                 state.cursor = pos
 
-        # according to CommonMark Example 6, the second tab should be
-        # treated as 4 spaces
-        return expand_tab(text), end_pos
+        return ''.join(parts), end_pos
 
     def parse_block_quote(self, m: Match[str], state: BlockState) -> int:
         """Parse token for block quote. Here is an example of the syntax:
@@ -413,16 +436,16 @@ class BlockParser(Parser[BlockState]):
         if marker.startswith('</'):
             close_tag = marker[2:].lower()
             # rule 6
-            if close_tag in BLOCK_TAGS:
+            if close_tag in _BLOCK_TAGS_SET:
                 return _parse_html_to_newline(state, self.BLANK_LINE)
         else:
             open_tag = marker[1:].lower()
             # rule 1
-            if open_tag in PRE_TAGS:
+            if open_tag in _PRE_TAGS_SET:
                 end_tag = '</' + open_tag + '>'
                 return _parse_html_to_end(state, end_tag, m.end())
             # rule 6
-            if open_tag in BLOCK_TAGS:
+            if open_tag in _BLOCK_TAGS_SET:
                 return _parse_html_to_newline(state, self.BLANK_LINE)
 
         # Blocks of type 7 may not interrupt a paragraph.
@@ -440,44 +463,54 @@ class BlockParser(Parser[BlockState]):
         return None
 
     def parse(self, state: BlockState, rules: Optional[List[str]]=None) -> None:
-        sc = self.compile_sc(rules)
-
-        while state.cursor < state.cursor_max:
-            m = sc.search(state.src, state.cursor)
+        sc_search = self.compile_sc(rules).search
+        # every group name in the scanner is a rule name, dispatch
+        # to the parse method directly instead of via parse_method
+        methods = self._methods
+
+        src = state.src
+        cursor = state.cursor
+        cursor_max = state.cursor_max
+        add_paragraph = state.add_paragraph
+
+        # the cursor is kept in a local, and written back to the state
+        # before calling a parse method, which reads and moves it
+        while cursor < cursor_max:
+            m = sc_search(src, cursor)
             if not m:
                 break
 
             end_pos = m.start()
-            if end_pos > state.cursor:
-                text = state.get_text(end_pos)
-                state.add_paragraph(text)
-                state.cursor = end_pos
+            if end_pos > cursor:
+                add_paragraph(src[cursor:end_pos])
 
-            end_pos2 = self.parse_method(m, state)
+            state.cursor = end_pos
+            lastgroup = m.lastgroup
+            assert lastgroup
+            end_pos2 = methods[lastgroup](m, state)
             if end_pos2:
-                state.cursor = end_pos2
+                cursor = end_pos2
             else:
-                end_pos3 = state.find_line_end()
-                text = state.get_text(end_pos3)
-                state.add_paragraph(text)
-                state.cursor = end_pos3
+                cursor = state.cursor
+                end_pos3 = src.find('\n', cursor)
+                end_pos3 = cursor_max if end_pos3 == -1 else end_pos3 + 1
+                add_paragraph(src[cursor:end_pos3])
+                cursor = end_pos3
 
-        if state.cursor < state.cursor_max:
-            text = state.src[state.cursor:]
-            state.add_paragraph(text)
-            state.cursor = state.cursor_max
+        if cursor < cursor_max:
+            add_paragraph(src[cursor:])
+            cursor = cursor_max
+        state.cursor = cursor
 
 
 def _parse_html_to_end(state: BlockState, end_marker: str, start_pos: int) -> int:
-    marker_pos = state.src.find(end_marker, start_pos)
-    if marker_pos == -1:
+    m = _HTML_END_RE[end_marker].search(state.src, start_pos)
+    if m:
+        end_pos = m.end()
+        text = state.get_text(end_pos)
+    else:
         text = state.src[state.cursor:]
         end_pos = state.cursor_max
-    else:
-        text = state.get_text(marker_pos)
-        state.cursor = marker_pos
-        end_pos = state.find_line_end()
-        text += state.get_text(end_pos)
 
     state.append_token({'type': 'block_html', 'raw': text})
     return end_pos
@@ -494,3 +527,49 @@ def _parse_html_to_newline(state: BlockState, newline: Pattern[str]) -> int:
 
     state.append_token({'type': 'block_html', 'raw': text})
     return end_pos
+
+
+@lru_cache(maxsize=64)
+def _fenced_end_re(c: str, n: int) -> Pattern[str]:
+    return re.compile(r'^ {0,3}' + c + '{' + str(n) + r',}[ \t]*(?:\n|$)', re.M)
+
+
+@lru_cache(maxsize=64)
+def _fenced_trim_re(n: int) -> Pattern[str]:
+    return re.compile('^ {0,' + str(n) + '}', re.M)
+
+
+def _expand_lazy_line(line: str) -> str:
+    # same as ``expand_tab(expand_leading_tab(line, 3))``: the leading
+    # tab becomes 3 spaces, a directly following tab becomes 4 spaces
+    if '\t' not in line:
+        return line
+    return _LAZY_LINE_TAB.sub(_lazy_line_tab_repl, line)
+
+
+def _lazy_line_tab_repl(m: Match[str]) -> str:
+    if m.group(1):
+        return '       '
+    return '   '
+
+
+def _trim_block_quote_line(line: str) -> str:
+    # the text after ``>``: a leading tab is treated as 3 spaces,
+    # then the optional space after the marker is removed
+    tab_pos = line.find('\t', 0, 4)
+    if tab_pos != -1 and not line[:tab_pos].strip(' '):
+        return '  ' + line[tab_pos + 1:]
+    if line[:1] == ' ':
+        return line[1:]
+    return line
+
+
+def _strip_block_quote_marker(text: str) -> str:
+    # every line is matched by _STRICT_BLOCK_QUOTE, which means the
+    # first ``>`` of each line is the block quote marker
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        pos = line.find('>')
+        if pos != -1:
+            lines[i] = _trim_block_quote_line(line[pos + 1:])
+    return '\n'.join(lines)
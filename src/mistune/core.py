@@ -12,7 +12,9 @@ from typing import (
     MutableMapping,
     Optional,
     Pattern,
+    Sequence,
     Set,
+    Tuple,
     Type,
     TypeVar,
     Union,
@@ -32,6 +34,7 @@ class BlockState:
     list_tight: bool
     parent: Any
     env: MutableMapping[str, Any]
+    blank_line_offsets: Optional[List[int]]
 
     def __init__(self, parent: Optional[Any] = None) -> None:
         self.src = ''
@@ -41,6 +44,9 @@ class BlockState:
         self.cursor = 0
         self.cursor_max = 0
 
+        # start positions of blank lines in src, collected on first use
+        self.blank_line_offsets = None
+
         # for list and block quote chain
         self.list_tight = True
         self.parent = parent
@@ -59,6 +65,7 @@ class BlockState:
     def process(self, src: str) -> None:
         self.src = src
         self.cursor_max = len(src)
+        self.blank_line_offsets = None
 
     def find_line_end(self) -> int:
         m = _LINE_END.search(self.src, self.cursor)
@@ -81,17 +88,17 @@ class BlockState:
         self.tokens.append(token)
 
     def add_paragraph(self, text: str) -> None:
-        last_token = self.last_token()
-        if last_token and last_token['type'] == 'paragraph':
-            last_token['text'] += text
+        tokens = self.tokens
+        if tokens and tokens[-1]['type'] == 'paragraph':
+            tokens[-1]['text'] += text
         else:
-            self.tokens.append({'type': 'paragraph', 'text': text})
+            tokens.append({'type': 'paragraph', 'text': text})
 
     def append_paragraph(self) -> Optional[int]:
-        last_token = self.last_token()
-        if last_token and last_token['type'] == 'paragraph':
+        tokens = self.tokens
+        if tokens and tokens[-1]['type'] == 'paragraph':
             pos = self.find_line_end()
-            last_token['text'] += self.get_text(pos)
+            tokens[-1]['text'] += self.get_text(pos)
             return pos
         return None
 
@@ -151,14 +158,16 @@ class Parser(Generic[ST]):
             Callable[[Match[str], ST], Optional[int]],
         ] = {}
 
-        self.__sc: Dict[str, Pattern[str]] = {}
+        self.__sc: Dict[Union[str, Tuple[str, ...]], Pattern[str]] = {}
 
-    def compile_sc(self, rules: Optional[List[str]] = None) -> Pattern[str]:
+    def compile_sc(self, rules: Optional[Sequence[str]] = None) -> Pattern[str]:
+        key: Union[str, Tuple[str, ...]]
         if rules is None:
             key = '$'
             rules = self.rules
         else:
-            key = '|'.join(rules)
+            # rule lists can be modified by plugins, key by their content
+            key = tuple(rules)
 
         sc = self.__sc.get(key)
         if sc:
@@ -28,7 +28,7 @@ PAREN_END_RE = re.compile(r'\s*\)')
 HTML_TAGNAME = r'[A-Za-z][A-Za-z0-9-]*'
 HTML_ATTRIBUTES = (
     r'(?:\s+[A-Za-z_:][A-Za-z0-9_.:-]*'
-    r'(?:\s*=\s*(?:[^ !"\'=<>`]+|\'[^\']*?\'|"[^\"]*?"))?)*'
+    r'(?:\s*=\s*(?:[^\s!"\'=<>`]+|\'[^\']*?\'|"[^\"]*?"))?)*'
 )
 
 BLOCK_TAGS = (
@@ -50,6 +50,8 @@ _ESCAPE_CHAR_RE = re.compile(r'\\(' + PUNCTUATION + r')')
 
 
 def unescape_char(text: str) -> str:
+    if '\\' not in text:
+        return text
     return _ESCAPE_CHAR_RE.sub(r'\1', text)
 
 
@@ -54,21 +54,24 @@ class Markdown:
         data = self._iter_render(state.tokens, state)
         if self.renderer:
             return self.renderer(data, state)
-        return list(data)
+        return data
 
     def _iter_render(
-        self, tokens: Iterable[Dict[str, Any]], state: BlockState
-    ) -> Iterable[Dict[str, Any]]:
+        self, tokens: List[Dict[str, Any]], state: BlockState
+    ) -> List[Dict[str, Any]]:
+        # tokens are updated in place, the list is returned as it is
+        # instead of being copied into a new one at every level
         for tok in tokens:
-            if 'children' in tok:
-                children = self._iter_render(tok['children'], state)
-                tok['children'] = list(children)
-            elif 'text' in tok:
-                text = tok.pop('text')
-                # process inline text
-                # avoid striping emsp or other unicode spaces
-                tok['children'] = self.inline(text.strip(' \r\n\t\f'), state.env)
-            yield tok
+            children = tok.get('children')
+            if children is not None:
+                self._iter_render(children, state)
+            else:
+                text = tok.pop('text', None)
+                if text is not None:
+                    # process inline text
+                    # avoid striping emsp or other unicode spaces
+                    tok['children'] = self.inline(text.strip(' \r\n\t\f'), state.env)
+        return tokens
 
     def parse(
         self, s: str, state: Optional[BlockState] = None
@@ -7,6 +7,9 @@ _expand_tab_re = re.compile(r'^( {0,3})\t', flags=re.M)
 
 
 def expand_leading_tab(text: str, width: int = 4) -> str:
+    if '\t' not in text:
+        return text
+
     def repl(m: Match[str]) -> str:
         s = m.group(1)
         return s + ' ' * (width - len(s))
@@ -14,6 +17,8 @@ def expand_leading_tab(text: str, width: int = 4) -> str:
 
 
 def expand_tab(text: str, space: str = "    ") -> str:
+    if '\t' not in text:
+        return text
     repl = r"\1" + space
     return _expand_tab_re.sub(repl, text)
 
@@ -109,3 +109,24 @@ class TestMiscCases(TestCase):
         result = md('foo\n- bar\n\ntable')
         expected = '<p>foo</p>\n<ul>\n<li>bar</li>\n</ul>\n<p>table</p>'
         self.assertEqual(result.strip(), expected)
+
+    def test_html_attributes_with_tabs(self):
+        # unquoted attribute values must not contain whitespace, otherwise
+        # the attributes pattern backtracks exponentially
+        text = '<abc' + ' a=b\tc' * 22 + ' "'
+        result = mistune.html(text)
+        expected = '<p>&lt;abc' + ' a=b\tc' * 22 + ' &quot;</p>'
+        self.assertEqual(result.strip(), expected)
+
+    def test_plugin_overrides_block_rule(self):
+        def plus_thematic_break(md):
+            md.block.register(
+                'thematic_break',
+                r'^ {0,3}((?:-[ \t]*){3,}|(?:_[ \t]*){3,}|(?:\*[ \t]*){3,}|(?:\+[ \t]*){3,})$',
+                lambda block, m, state: block.parse_thematic_break(m, state),
+            )
+
+        md = mistune.create_markdown(plugins=[plus_thematic_break])
+        result = md('> quote\n+++\n')
+        expected = '<blockquote>\n<p>quote</p>\n</blockquote>\n<hr />'
+        self.assertEqual(result.strip(), expected)